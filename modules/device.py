@@ -5,10 +5,12 @@ Device specific handeling for NetBox to Zabbix
 """
 from os import sys
 from re import search
-from logging import getLogger
+from functools import partial
+from logging import getLogger, DEBUG
+from threading import Lock
 from zabbix_utils import APIRequestError
 from modules.exceptions import (SyncInventoryError, TemplateError, SyncExternalError,
-                                InterfaceConfigError, JournalError)
+                                InterfaceConfigError)
 from modules.interface import ZabbixInterface
 from modules.hostgroups import Hostgroup
 try:
@@ -25,14 +27,39 @@ except ModuleNotFoundError:
            "Please create the file or rename the config.py.example file to config.py.")
     sys.exit(0)
 
+# Zabbix host properties which are checked against NetBox
+ZABBIX_HOST_SELECT = {"selectInterfaces": ['type', 'ip', 'port', 'details', 'interfaceid'],
+                      "selectGroups": ["groupid"],
+                      "selectParentTemplates": ["templateid"],
+                      "selectInventory": list(inventory_map.values())}
+# Inventory map with the NetBox paths split once, they are the same for every host
+INVENTORY_PATHS = tuple((nb_inv_field, tuple(nb_inv_field.split("/")), zbx_inv_field)
+                        for nb_inv_field, zbx_inv_field in inventory_map.items())
+
 class PhysicalDevice():
     # pylint: disable=too-many-instance-attributes, too-many-arguments, too-many-positional-arguments
     """
     Represents Network device.
-    INPUT: (NetBox device class, ZabbixAPI class, journal flag, NB journal class)
+    INPUT: (NetBox device class, ZabbixAPI class, NB journal buffer,
+            NetBox version, Zabbix major version, journal flag, logger,
+            NB update buffer)
     """
-
-    def __init__(self, nb, zabbix, nb_journal_class, nb_version, journal=None, logger=None):
+    # A host object is created for every NetBox device or VM.
+    # Slots keep these objects small and attribute access fast.
+    __slots__ = ("nb", "id", "name", "visible_name", "use_visible_name", "status",
+                 "zabbix", "zabbix_id", "group_id", "nb_api_version", "zabbix_version",
+                 "zbx_template_names", "zbx_templates", "hostgroup", "tenant",
+                 "config_context", "zbxproxy", "zabbix_state", "journal", "nb_journals",
+                 "inventory_mode", "inventory", "logger", "cidr", "ip", "zbx_interfaces",
+                 "nb_update_buffer")
+    # Hosts are processed by multiple worker threads. Hostgroup
+    # creation is guarded so that a group is only created once.
+    hostgroup_lock = Lock()
+    # Guards the known Zabbix host names so that a host is only created once.
+    hostname_lock = Lock()
+
+    def __init__(self, nb, zabbix, nb_journal_class, nb_version, zabbix_version,
+                 journal=None, logger=None, nb_update_buffer=None):
         self.nb = nb
         self.id = nb.id
         self.name = nb.name
@@ -42,6 +69,7 @@ class PhysicalDevice():
         self.zabbix_id = None
         self.group_id = None
         self.nb_api_version = nb_version
+        self.zabbix_version = zabbix_version
         self.zbx_template_names = []
         self.zbx_templates = []
         self.hostgroup = None
@@ -53,6 +81,8 @@ class PhysicalDevice():
         self.nb_journals = nb_journal_class
         self.inventory_mode = -1
         self.inventory = {}
+        self.zbx_interfaces = None
+        self.nb_update_buffer = nb_update_buffer
         self.logger = logger if logger else getLogger(__name__)
         self._setBasics()
 
@@ -91,9 +121,10 @@ class PhysicalDevice():
             self.name = f"NETBOX_ID{self.id}"
             self.visible_name = self.nb.name
             self.use_visible_name = True
-            self.logger.info(f"Host {self.visible_name} contains special characters. "
-                             f"Using {self.name} as name for the NetBox object "
-                             f"and using {self.visible_name} as visible name in Zabbix.")
+            self.logger.info("Host %s contains special characters. "
+                             "Using %s as name for the NetBox object "
+                             "and using %s as visible name in Zabbix.",
+                             self.visible_name, self.name, self.visible_name)
         else:
             pass
 
@@ -179,10 +210,9 @@ class PhysicalDevice():
             return False
         self.inventory = {}
         if inventory_sync and self.inventory_mode in [0,1]:
-            self.logger.debug(f"Host {self.name}: Starting inventory mapper")
+            self.logger.debug("Host %s: Starting inventory mapper", self.name)
             # Let's build an inventory dict for each property in the inventory_map
-            for nb_inv_field, zbx_inv_field in inventory_map.items():
-                field_list = nb_inv_field.split("/") # convert str to list based on delimiter
+            for nb_inv_field, field_list, zbx_inv_field in INVENTORY_PATHS:
                 # start at the base of the dict...
                 value = nbdevice
                 # ... and step through the dict till we find the needed value
@@ -196,15 +226,17 @@ class PhysicalDevice():
                     self.inventory[zbx_inv_field] = str(value)
                 elif not value:
                     # empty value should just be an empty string for API compatibility
-                    self.logger.debug(f"Host {self.name}: NetBox inventory lookup for "
-                                      f"'{nb_inv_field}' returned an empty value")
+                    self.logger.debug("Host %s: NetBox inventory lookup for "
+                                      "'%s' returned an empty value", self.name, nb_inv_field)
                     self.inventory[zbx_inv_field] = ""
                 else:
                     # Value is not a string or numeral, probably not what the user expected.
                     self.logger.error(f"Host {self.name}: Inventory lookup for '{nb_inv_field}'"
                                       " returned an unexpected type: it will be skipped.")
-            self.logger.debug(f"Host {self.name}: Inventory mapping complete. "
-                            f"Mapped {len(list(filter(None, self.inventory.values())))} field(s)")
+            # Only count the mapped fields when the message is logged
+            if self.logger.isEnabledFor(DEBUG):
+                self.logger.debug("Host %s: Inventory mapping complete. Mapped %s field(s)",
+                                  self.name, len(list(filter(None, self.inventory.values()))))
         return True
 
     def isCluster(self):
@@ -237,18 +269,18 @@ class PhysicalDevice():
         """
         masterid = self.getClusterMaster()
         if masterid == self.id:
-            self.logger.debug(f"Host {self.name} is primary cluster member. "
-                              f"Modifying hostname from {self.name} to " +
-                              f"{self.nb.virtual_chassis.name}.")
+            self.logger.debug("Host %s is primary cluster member. "
+                              "Modifying hostname from %s to %s.",
+                              self.name, self.name, self.nb.virtual_chassis.name)
             self.name = self.nb.virtual_chassis.name
             return True
-        self.logger.debug(f"Host {self.name} is non-primary cluster member.")
+        self.logger.debug("Host %s is non-primary cluster member.", self.name)
         return False
 
     def zbxTemplatePrepper(self, templates):
         """
         Returns Zabbix template IDs
-        INPUT: list of templates from Zabbix
+        INPUT: dict of templates from Zabbix, keyed by name
         OUTPUT: True
         """
         # Check if there are templates defined
@@ -260,50 +292,45 @@ class PhysicalDevice():
         self.zbx_templates = []
         # Go through all templates definded in NetBox
         for nb_template in self.zbx_template_names:
-            template_match = False
-            # Go through all templates found in Zabbix
-            for zbx_template in templates:
-                # If the template names match
-                if zbx_template['name'] == nb_template:
-                    # Set match variable to true, add template details
-                    # to class variable and return debug log
-                    template_match = True
-                    self.zbx_templates.append({"templateid": zbx_template['templateid'],
-                                               "name": zbx_template['name']})
-                    e = f"Host {self.name}: found template {zbx_template['name']}"
-                    self.logger.debug(e)
+            zbx_template = templates.get(nb_template)
             # Return error should the template not be found in Zabbix
-            if not template_match:
+            if not zbx_template:
                 e = (f"Unable to find template {nb_template} "
                     f"for host {self.name} in Zabbix. Skipping host...")
                 self.logger.warning(e)
                 raise SyncInventoryError(e)
+            # Add template details to class variable and return debug log
+            self.zbx_templates.append({"templateid": zbx_template['templateid'],
+                                       "name": zbx_template['name']})
+            self.logger.debug("Host %s: found template %s", self.name, zbx_template['name'])
 
     def setZabbixGroupID(self, groups):
         """
         Sets Zabbix group ID as instance variable
-        INPUT: list of hostgroups
+        INPUT: dict of hostgroups, keyed by name
         OUTPUT: True / False
         """
-        # Go through all groups
-        for group in groups:
-            if group['name'] == self.hostgroup:
-                self.group_id = group['groupid']
-                e = f"Host {self.name}: matched group {group['name']}"
-                self.logger.debug(e)
-                return True
+        group = groups.get(self.hostgroup)
+        if group:
+            self.group_id = group['groupid']
+            self.logger.debug("Host %s: matched group %s", self.name, group['name'])
+            return True
         return False
 
-    def cleanup(self):
+    def cleanup(self, zabbix_hosts=None):
         """
         Removes device from external resources.
         Resets custom fields in NetBox.
+        INPUT: (optional) dict of all Zabbix hosts keyed by hostid
         """
         if self.zabbix_id:
             try:
                 # Check if the Zabbix host exists in Zabbix
-                zbx_host = bool(self.zabbix.host.get(filter={'hostid': self.zabbix_id},
-                                                     output=[]))
+                if zabbix_hosts is not None:
+                    zbx_host = str(self.zabbix_id) in zabbix_hosts
+                else:
+                    zbx_host = bool(self.zabbix.host.get(filter={'hostid': self.zabbix_id},
+                                                         output=[]))
                 e = (f"Host {self.name}: was already deleted from Zabbix."
                         " Removed link in NetBox.")
                 if zbx_host:
@@ -321,29 +348,47 @@ class PhysicalDevice():
     def _zeroize_cf(self):
         """Sets the hostID custom field in NetBox to zero,
         effectively destroying the link"""
-        self.nb.custom_fields[device_cf] = None
-        self.nb.save()
+        self._set_nb_custom_field(device_cf, None)
+
+    def _set_nb_custom_field(self, name, value):
+        """
+        Sets a custom field of this host in NetBox.
+        The change is added to the NB update buffer when provided,
+        otherwise the host is updated right away.
+        """
+        updates = {"custom_fields": {name: value}}
+        if self.nb_update_buffer is not None:
+            self.nb_update_buffer.add(self.nb, updates)
+        else:
+            self.nb.update(updates)
 
-    def _zabbixHostnameExists(self):
+    def _zabbixHostnameExists(self, zabbix_hostnames=None):
         """
         Checks if hostname exists in Zabbix.
+        INPUT: (optional) dict with a set of all Zabbix host names ('host')
+        and a set of all visible names ('name')
         """
         # Validate the hostname or visible name field
         if not self.use_visible_name:
-            zbx_filter = {'host': self.name}
+            field, hostname = 'host', self.name
         else:
-            zbx_filter = {'name': self.visible_name}
-        host = self.zabbix.host.get(filter=zbx_filter, output=[])
+            field, hostname = 'name', self.visible_name
+        if zabbix_hostnames is not None:
+            return hostname in zabbix_hostnames[field]
+        host = self.zabbix.host.get(filter={field: hostname}, output=[])
         return bool(host)
 
     def setInterfaceDetails(self):
         """
         Checks interface parameters from NetBox and
         creates a model for the interface to be used in Zabbix.
+        The model is only created once per host.
         """
+        if self.zbx_interfaces is not None:
+            return self.zbx_interfaces
         try:
             # Initiate interface class
-            interface = ZabbixInterface(self.nb.config_context, self.ip)
+            interface = ZabbixInterface(self.config_context, self.ip)
             # Check if NetBox has device context.
             # If not fall back to old config.
             if interface.get_context():
@@ -352,7 +397,8 @@ class PhysicalDevice():
                     interface.set_snmp()
             else:
                 interface.set_default_snmp()
-            return [interface.interface]
+            self.zbx_interfaces = [interface.interface]
+            return self.zbx_interfaces
         except InterfaceConfigError as e:
             message = f"{self.name}: {e}"
             self.logger.warning(message)
@@ -363,137 +409,172 @@ class PhysicalDevice():
         Sets proxy or proxy group if this
         value has been defined in config context
 
-        input: List of all proxies and proxy groups in standardized format
+        input: Dict of all proxies and proxy groups in standardized format,
+        keyed by proxy type and proxy name
         """
         # check if the key Zabbix is defined in the config context
-        if not "zabbix" in self.nb.config_context:
+        zabbix_context = self.config_context.get("zabbix")
+        if zabbix_context is None:
             return False
-        if ("proxy" in self.nb.config_context["zabbix"] and
-               not self.nb.config_context["zabbix"]["proxy"]):
+        if "proxy" in zabbix_context and not zabbix_context["proxy"]:
             return False
         # Proxy group takes priority over a proxy due
         # to it being HA and therefore being more reliable
         # Includes proxy group fix since Zabbix <= 6 should ignore this
         proxy_types = ["proxy"]
-        if str(self.zabbix.version).startswith('7'):
+        if self.zabbix_version >= 7:
             # Only insert groups in front of list for Zabbix7
             proxy_types.insert(0, "proxy_group")
         for proxy_type in proxy_types:
             # Check if the key exists in NetBox CC
-            if proxy_type in self.nb.config_context["zabbix"]:
-                proxy_name = self.nb.config_context["zabbix"][proxy_type]
-                # go through all proxies
-                for proxy in proxy_list:
-                    # If the proxy does not match the type, ignore and continue
-                    if not proxy["type"] == proxy_type:
-                        continue
-                    # If the proxy name matches
-                    if proxy["name"] == proxy_name:
-                        self.logger.debug(f"Host {self.name}: using {proxy['type']}"
-                                          f" {proxy_name}")
-                        self.zbxproxy = proxy
-                        return True
+            if proxy_type in zabbix_context:
+                proxy_name = zabbix_context[proxy_type]
+                # Look up the proxy of this type by name
+                proxy = proxy_list[proxy_type].get(proxy_name)
+                if proxy:
+                    self.logger.debug("Host %s: using %s %s",
+                                      self.name, proxy['type'], proxy_name)
+                    self.zbxproxy = proxy
+                    return True
                 self.logger.warning(f"Host {self.name}: unable to find proxy {proxy_name}")
         return False
 
     def createInZabbix(self, groups, templates, proxies,
-                       description="Host added by NetBox sync script."):
+                       description="Host added by NetBox sync script.",
+                       zabbix_hostnames=None):
         """
         Creates Zabbix host object with parameters from NetBox object.
         """
-        # Check if hostname is already present in Zabbix
-        if not self._zabbixHostnameExists():
-            # Set group and template ID's for host
-            if not self.setZabbixGroupID(groups):
-                e = (f"Unable to find group '{self.hostgroup}' "
-                     f"for host {self.name} in Zabbix.")
+        # Check if hostname is already present in Zabbix. The name is reserved
+        # in the same step so that other NetBox objects with the same name
+        # are not created as well.
+        with self.hostname_lock:
+            if self._zabbixHostnameExists(zabbix_hostnames):
+                e = f"Host {self.name}: Unable to add to Zabbix. Host already present."
                 self.logger.warning(e)
-                raise SyncInventoryError(e)
-            self.zbxTemplatePrepper(templates)
-            templateids = []
-            for template in self.zbx_templates:
-                templateids.append({'templateid': template['templateid']})
-            # Set interface, group and template configuration
-            interfaces = self.setInterfaceDetails()
-            groups = [{"groupid": self.group_id}]
-            # Set Zabbix proxy if defined
-            self.setProxy(proxies)
-            # Set basic data for host creation
-            create_data = {"host": self.name,
-                            "name": self.visible_name,
-                            "status": self.zabbix_state,
-                            "interfaces": interfaces,
-                            "groups": groups,
-                            "templates": templateids,
-                            "description": description,
-                            "inventory_mode": self.inventory_mode,
-                            "inventory": self.inventory
-                            }
-            # If a Zabbix proxy or Zabbix Proxy group has been defined
-            if self.zbxproxy:
-                # If a lower version than 7 is used, we can assume that
-                # the proxy is a normal proxy and not a proxy group
-                if not str(self.zabbix.version).startswith('7'):
-                    create_data["proxy_hostid"] = self.zbxproxy["id"]
-                else:
-                    # Configure either a proxy or proxy group
-                    create_data[self.zbxproxy["idtype"]] = self.zbxproxy["id"]
-                    create_data["monitored_by"] = self.zbxproxy["monitored_by"]
-            # Add host to Zabbix
-            try:
-                host = self.zabbix.host.create(**create_data)
-                self.zabbix_id = host["hostids"][0]
-            except APIRequestError as e:
-                e = f"Host {self.name}: Couldn't create. Zabbix returned {str(e)}."
-                self.logger.error(e)
-                raise SyncExternalError(e) from None
-            # Set NetBox custom field to hostID value.
-            self.nb.custom_fields[device_cf] = int(self.zabbix_id)
-            self.nb.save()
-            msg = f"Host {self.name}: Created host in Zabbix."
-            self.logger.info(msg)
-            self.create_journal_entry("success", msg)
-        else:
-            e = f"Host {self.name}: Unable to add to Zabbix. Host already present."
+                return
+            reserved = self._reserveZabbixHostname(zabbix_hostnames)
+        try:
+            self._createZabbixHost(groups, templates, proxies, description)
+        except (SyncInventoryError, SyncExternalError):
+            # The host has not been created, release its name
+            with self.hostname_lock:
+                for field, hostname in reserved.items():
+                    zabbix_hostnames[field].discard(hostname)
+            raise
+
+    def _reserveZabbixHostname(self, zabbix_hostnames=None):
+        """
+        Adds the hostname and visible name to the known Zabbix hosts.
+        Returns the names which were not known yet, keyed by field.
+        """
+        if zabbix_hostnames is None:
+            return {}
+        reserved = {}
+        for field, hostname in (("host", self.name), ("name", self.visible_name or self.name)):
+            if hostname not in zabbix_hostnames[field]:
+                zabbix_hostnames[field].add(hostname)
+                reserved[field] = hostname
+        return reserved
+
+    def _createZabbixHost(self, groups, templates, proxies, description):
+        """
+        Creates the Zabbix host and saves its ID in NetBox.
+        """
+        # Set group and template ID's for host
+        if not self.setZabbixGroupID(groups):
+            e = (f"Unable to find group '{self.hostgroup}' "
+                 f"for host {self.name} in Zabbix.")
             self.logger.warning(e)
+            raise SyncInventoryError(e)
+        self.zbxTemplatePrepper(templates)
+        templateids = []
+        for template in self.zbx_templates:
+            templateids.append({'templateid': template['templateid']})
+        # Set interface, group and template configuration
+        interfaces = self.setInterfaceDetails()
+        groups = [{"groupid": self.group_id}]
+        # Set Zabbix proxy if defined
+        self.setProxy(proxies)
+        # Set basic data for host creation
+        create_data = {"host": self.name,
+                        "name": self.visible_name,
+                        "status": self.zabbix_state,
+                        "interfaces": interfaces,
+                        "groups": groups,
+                        "templates": templateids,
+                        "description": description,
+                        "inventory_mode": self.inventory_mode,
+                        "inventory": self.inventory
+                        }
+        # If a Zabbix proxy or Zabbix Proxy group has been defined
+        if self.zbxproxy:
+            # If a lower version than 7 is used, we can assume that
+            # the proxy is a normal proxy and not a proxy group
+            if self.zabbix_version < 7:
+                create_data["proxy_hostid"] = self.zbxproxy["id"]
+            else:
+                # Configure either a proxy or proxy group
+                create_data[self.zbxproxy["idtype"]] = self.zbxproxy["id"]
+                create_data["monitored_by"] = self.zbxproxy["monitored_by"]
+        # Add host to Zabbix
+        try:
+            host = self.zabbix.host.create(**create_data)
+            self.zabbix_id = host["hostids"][0]
+        except APIRequestError as e:
+            e = f"Host {self.name}: Couldn't create. Zabbix returned {str(e)}."
+            self.logger.error(e)
+            raise SyncExternalError(e) from None
+        # Set NetBox custom field to hostID value.
+        self._set_nb_custom_field(device_cf, int(self.zabbix_id))
+        msg = f"Host {self.name}: Created host in Zabbix."
+        self.logger.info(msg)
+        self.create_journal_entry("success", msg)
 
     def createZabbixHostgroup(self, hostgroups):
         """
         Creates Zabbix host group based on hostgroup format.
         Creates multiple when using a nested format.
+        New groups are also added to the provided hostgroups.
         """
         final_data = []
-        # Check if the hostgroup is in a nested format and check each parent
-        for pos in range(len(self.hostgroup.split('/'))):
-            zabbix_hg = self.hostgroup.rsplit('/', pos)[0]
-            if self.lookupZabbixHostgroup(hostgroups, zabbix_hg):
-                # Hostgroup already exists
-                continue
-            # Create new group
+        with self.hostgroup_lock:
+            # Check if the hostgroup is in a nested format and check each parent
+            missing_groups = []
+            for pos in range(len(self.hostgroup.split('/'))):
+                zabbix_hg = self.hostgroup.rsplit('/', pos)[0]
+                if self.lookupZabbixHostgroup(hostgroups, zabbix_hg):
+                    # Hostgroup already exists
+                    continue
+                missing_groups.append(zabbix_hg)
+            if not missing_groups:
+                return final_data
+            # Create all new groups with a single API call to Zabbix
             try:
-                # API call to Zabbix
-                groupid = self.zabbix.hostgroup.create(name=zabbix_hg)
-                e = f"Hostgroup '{zabbix_hg}': created in Zabbix."
-                self.logger.info(e)
-                # Add group to final data
-                final_data.append({'groupid': groupid["groupids"][0], 'name': zabbix_hg})
+                groupids = self.zabbix.hostgroup.create(
+                    *[{"name": zabbix_hg} for zabbix_hg in missing_groups])
             except APIRequestError as e:
-                msg = f"Hostgroup '{zabbix_hg}': unable to create. Zabbix returned {str(e)}."
+                group_names = "', '".join(missing_groups)
+                msg = f"Hostgroup '{group_names}': unable to create. Zabbix returned {str(e)}."
                 self.logger.error(msg)
                 raise SyncExternalError(msg) from e
+            for zabbix_hg, groupid in zip(missing_groups, groupids["groupids"]):
+                e = f"Hostgroup '{zabbix_hg}': created in Zabbix."
+                self.logger.info(e)
+                # Add group to final data and all known groups
+                new_group = {'groupid': groupid, 'name': zabbix_hg}
+                final_data.append(new_group)
+                hostgroups[zabbix_hg] = new_group
         return final_data
 
     def lookupZabbixHostgroup(self, group_list, lookup_group):
         """
         Function to check if a hostgroup
-        exists in a list of Zabbix hostgroups
-        INPUT: Group list and group lookup
+        exists in the Zabbix hostgroups
+        INPUT: Group dict and group lookup
         OUTPUT: Boolean
         """
-        for group in group_list:
-            if group["name"] == lookup_group:
-                return True
-        return False
+        return lookup_group in group_list
 
     def updateZabbixHost(self, **kwargs):
         """
@@ -507,22 +588,51 @@ class PhysicalDevice():
                  f"Zabbix returned the following error: {str(e)}.")
             self.logger.error(e)
             raise SyncExternalError(e) from None
-        self.logger.info(f"Updated host {self.name} with data {kwargs}.")
+        self._zabbix_host_updated(kwargs)
+
+    def _zabbix_host_updated(self, updates):
+        """
+        Logs and journals a successful update of this host in Zabbix.
+        INPUT: dict of updated host properties
+        """
+        self.logger.info("Updated host %s with data %s.", self.name, updates)
         self.create_journal_entry("info", "Updated host in Zabbix with latest NB data.")
 
-    def ConsistencyCheck(self, groups, templates, proxies, proxy_power, create_hostgroups):
+    def _update_zabbix_interface(self, updates):
+        """
+        Updates the Zabbix interface of this host.
+        INPUT: dict of interface properties, including the interfaceid
+        """
+        try:
+            self.zabbix.hostinterface.update(updates)
+        except APIRequestError as e:
+            msg = f"Zabbix returned the following error: {str(e)}."
+            self.logger.error(msg)
+            raise SyncExternalError(msg) from e
+        self._zabbix_interface_updated()
+
+    def _zabbix_interface_updated(self):
+        """ Logs and journals a successful interface update in Zabbix. """
+        e = f"Host {self.name}: solved interface conflict."
+        self.logger.info(e)
+        self.create_journal_entry("info", e)
+
+    def ConsistencyCheck(self, groups, templates, proxies, proxy_power, create_hostgroups,
+                         zabbix_hosts=None, host_update_buffer=None):
         # pylint: disable=too-many-branches, too-many-statements
         """
         Checks if Zabbix object is still valid with NetBox parameters.
+        The Zabbix host is taken from zabbix_hosts (dict keyed by hostid)
+        when provided, otherwise it is requested from Zabbix.
+        Host and interface updates are added to host_update_buffer when
+        provided, otherwise the host is updated right away.
         """
         # If group is found or if the hostgroup is nested
         if not self.setZabbixGroupID(groups) or len(self.hostgroup.split('/')) > 1:
             if create_hostgroups:
-                # Script is allowed to create a new hostgroup
-                new_groups = self.createZabbixHostgroup(groups)
-                for group in new_groups:
-                    # Add all new groups to the list of groups
-                    groups.append(group)
+                # Script is allowed to create a new hostgroup.
+                # New groups are added to the provided groups.
+                self.createZabbixHostgroup(groups)
             # check if the initial group was not already found (and this is a nested folder check)
             if not self.group_id:
                 # Function returns true / false but also sets GroupID
@@ -534,14 +644,13 @@ class PhysicalDevice():
         # Prepare templates and proxy config
         self.zbxTemplatePrepper(templates)
         self.setProxy(proxies)
-        # Get host object from Zabbix
-        host = self.zabbix.host.get(filter={'hostid': self.zabbix_id},
-                                    selectInterfaces=['type', 'ip',
-                                                      'port', 'details',
-                                                      'interfaceid'],
-                                    selectGroups=["groupid"],
-                                    selectParentTemplates=["templateid"],
-                                    selectInventory=list(inventory_map.values()))
+        # Get host object from the preloaded hosts or from Zabbix
+        if zabbix_hosts is not None:
+            host = zabbix_hosts.get(str(self.zabbix_id))
+            host = [host] if host else []
+        else:
+            host = self.zabbix.host.get(filter={'hostid': self.zabbix_id},
+                                        **ZABBIX_HOST_SELECT)
         if len(host) > 1:
             e = (f"Got {len(host)} results for Zabbix hosts "
                  f"with ID {self.zabbix_id} - hostname {self.name}.")
@@ -554,20 +663,22 @@ class PhysicalDevice():
             self.logger.error(e)
             raise SyncInventoryError(e)
         host = host[0]
+        # Collect all changes and update the host with a single API call
+        host_updates = {}
         if host["host"] == self.name:
-            self.logger.debug(f"Host {self.name}: hostname in-sync.")
+            self.logger.debug("Host %s: hostname in-sync.", self.name)
         else:
             self.logger.warning(f"Host {self.name}: hostname OUT of sync. "
                                 f"Received value: {host['host']}")
-            self.updateZabbixHost(host=self.name)
+            host_updates["host"] = self.name
         # Execute check depending on wether the name is special or not
         if self.use_visible_name:
             if host["name"] == self.visible_name:
-                self.logger.debug(f"Host {self.name}: visible name in-sync.")
+                self.logger.debug("Host %s: visible name in-sync.", self.name)
             else:
                 self.logger.warning(f"Host {self.name}: visible name OUT of sync."
                                     f" Received value: {host['name']}")
-                self.updateZabbixHost(name=self.visible_name)
+                host_updates["name"] = self.visible_name
 
         # Check if the templates are in-sync
         if not self.zbx_template_comparer(host["parentTemplates"]):
@@ -577,45 +688,43 @@ class PhysicalDevice():
             for template in self.zbx_templates:
                 templateids.append({'templateid': template['templateid']})
             # Update Zabbix with NB templates and clear any old / lost templates
-            self.updateZabbixHost(templates_clear=host["parentTemplates"],
-                                      templates=templateids)
+            host_updates.update(templates_clear=host["parentTemplates"],
+                                templates=templateids)
         else:
-            self.logger.debug(f"Host {self.name}: template(s) in-sync.")
+            self.logger.debug("Host %s: template(s) in-sync.", self.name)
 
-        for group in host["groups"]:
-            if group["groupid"] == self.group_id:
-                self.logger.debug(f"Host {self.name}: hostgroup in-sync.")
-                break
+        if any(group["groupid"] == self.group_id for group in host["groups"]):
+            self.logger.debug("Host %s: hostgroup in-sync.", self.name)
         else:
             self.logger.warning(f"Host {self.name}: hostgroup OUT of sync.")
-            self.updateZabbixHost(groups={'groupid': self.group_id})
+            host_updates["groups"] = {'groupid': self.group_id}
 
         if int(host["status"]) == self.zabbix_state:
-            self.logger.debug(f"Host {self.name}: status in-sync.")
+            self.logger.debug("Host %s: status in-sync.", self.name)
         else:
             self.logger.warning(f"Host {self.name}: status OUT of sync.")
-            self.updateZabbixHost(status=str(self.zabbix_state))
+            host_updates["status"] = str(self.zabbix_state)
         # Check if a proxy has been defined
         if self.zbxproxy:
             # Check if proxy or proxy group is defined
             if (self.zbxproxy["idtype"] in host and
                 host[self.zbxproxy["idtype"]] == self.zbxproxy["id"]):
-                self.logger.debug(f"Host {self.name}: proxy in-sync.")
+                self.logger.debug("Host %s: proxy in-sync.", self.name)
             # Backwards compatibility for Zabbix <= 6
             elif "proxy_hostid" in host and host["proxy_hostid"] == self.zbxproxy["id"]:
-                self.logger.debug(f"Host {self.name}: proxy in-sync.")
+                self.logger.debug("Host %s: proxy in-sync.", self.name)
             # Proxy does not match, update Zabbix
             else:
                 self.logger.warning(f"Host {self.name}: proxy OUT of sync.")
                 # Zabbix <= 6 patch
-                if not str(self.zabbix.version).startswith('7'):
-                    self.updateZabbixHost(proxy_hostid=self.zbxproxy['id'])
+                if self.zabbix_version < 7:
+                    host_updates["proxy_hostid"] = self.zbxproxy['id']
                 # Zabbix 7+
                 else:
                     # Prepare data structure for updating either proxy or group
                     update_data = {self.zbxproxy["idtype"]: self.zbxproxy["id"],
                                    "monitored_by": self.zbxproxy['monitored_by']}
-                    self.updateZabbixHost(**update_data)
+                    host_updates.update(update_data)
         else:
             # No proxy is defined in NetBox
             proxy_set = False
@@ -629,13 +738,13 @@ class PhysicalDevice():
                 self.logger.warning(f"Host {self.name}: no proxy is configured in NetBox "
                                     "but is configured in Zabbix. Removing proxy config in Zabbix")
                 if "proxy_hostid" in host and bool(host["proxy_hostid"]):
-                    self.updateZabbixHost(proxy_hostid=0)
+                    host_updates["proxy_hostid"] = 0
                 # Zabbix 7 proxy
                 elif "proxyid" in host and bool(host["proxyid"]):
-                    self.updateZabbixHost(proxyid=0, monitored_by=0)
+                    host_updates.update(proxyid=0, monitored_by=0)
                 # Zabbix 7 proxy group
                 elif "proxy_groupid" in host and bool(host["proxy_groupid"]):
-                    self.updateZabbixHost(proxy_groupid=0, monitored_by=0)
+                    host_updates.update(proxy_groupid=0, monitored_by=0)
             # Checks if a proxy has been defined in Zabbix and if proxy_power config has been set
             if proxy_set and not proxy_power:
                 # Display error message
@@ -644,54 +753,62 @@ class PhysicalDevice():
                                     " -p flag was ommited: no "
                                     "changes have been made.")
             if not proxy_set:
-                self.logger.debug(f"Host {self.name}: proxy in-sync.")
+                self.logger.debug("Host %s: proxy in-sync.", self.name)
         # Check host inventory mode
         if str(host['inventory_mode']) == str(self.inventory_mode):
-            self.logger.debug(f"Host {self.name}: inventory_mode in-sync.")
+            self.logger.debug("Host %s: inventory_mode in-sync.", self.name)
         else:
             self.logger.warning(f"Host {self.name}: inventory_mode OUT of sync.")
-            self.updateZabbixHost(inventory_mode=str(self.inventory_mode))
+            host_updates["inventory_mode"] = str(self.inventory_mode)
         if inventory_sync and self.inventory_mode in [0,1]:
             # Check host inventory mapping
             if host['inventory'] == self.inventory:
-                self.logger.debug(f"Host {self.name}: inventory in-sync.")
+                self.logger.debug("Host %s: inventory in-sync.", self.name)
             else:
                 self.logger.warning(f"Host {self.name}: inventory OUT of sync.")
-                self.updateZabbixHost(inventory=self.inventory)
+                host_updates["inventory"] = self.inventory
+        if host_updates:
+            if host_update_buffer is not None:
+                host_update_buffer.add(self.name, {"hostid": self.zabbix_id, **host_updates},
+                                       partial(self.updateZabbixHost, **host_updates),
+                                       partial(self._zabbix_host_updated, host_updates))
+            else:
+                self.updateZabbixHost(**host_updates)
 
         # If only 1 interface has been found
         # pylint: disable=too-many-nested-blocks
         if len(host['interfaces']) == 1:
             updates = {}
-            # Go through each key / item and check if it matches Zabbix
-            for key, item in self.setInterfaceDetails()[0].items():
-                # Check if NetBox value is found in Zabbix
-                if key in host["interfaces"][0]:
-                    # If SNMP is used, go through nested dict
-                    # to compare SNMP parameters
-                    if isinstance(item,dict) and key == "details":
-                        for k, i in item.items():
-                            if k in host["interfaces"][0][key]:
-                                # Set update if values don't match
-                                if host["interfaces"][0][key][k] != str(i):
-                                    # If dict has not been created, add it
-                                    if key not in updates:
-                                        updates[key] = {}
-                                    updates[key][k] = str(i)
-                                    # If SNMP version has been changed
-                                    # break loop and force full SNMP update
-                                    if k == "version":
-                                        break
-                        # Force full SNMP config update
-                        # when version has changed.
-                        if key in updates:
-                            if "version" in updates[key]:
-                                for k, i in item.items():
-                                    updates[key][k] = str(i)
+            nb_interface = self.setInterfaceDetails()[0]
+            zbx_interface = host["interfaces"][0]
+            # Go through each key / item known to both NetBox
+            # and Zabbix and check if the values match
+            for key in nb_interface.keys() & zbx_interface.keys():
+                item = nb_interface[key]
+                # If SNMP is used, go through nested dict
+                # to compare SNMP parameters
+                if key == "details" and isinstance(item, dict):
+                    # Zabbix returns an empty list for interfaces without details
+                    zbx_details = zbx_interface[key] if isinstance(zbx_interface[key], dict) else {}
+                    # Zabbix returns all values as strings
+                    nb_details = {k: str(i) for k, i in item.items()}
+                    # Skip the per key checks when all NetBox values are in Zabbix
+                    if nb_details.items() <= zbx_details.items():
+                        continue
+                    # Force full SNMP config update when version has changed.
+                    if ("version" in nb_details and "version" in zbx_details and
+                            zbx_details["version"] != nb_details["version"]):
+                        updates[key] = nb_details
                         continue
-                    # Set update if values don't match
-                    if host["interfaces"][0][key] != str(item):
-                        updates[key] = item
+                    # Set update for the SNMP values which don't match
+                    details = {k: v for k, v in nb_details.items()
+                               if k in zbx_details and zbx_details[k] != v}
+                    if details:
+                        updates[key] = details
+                    continue
+                # Set update if values don't match
+                if zbx_interface[key] != str(item):
+                    updates[key] = item
             if updates:
                 # If interface updates have been found: push to Zabbix
                 self.logger.warning(f"Host {self.name}: Interface OUT of sync.")
@@ -703,20 +820,15 @@ class PhysicalDevice():
                     raise InterfaceConfigError(e)
                 # Set interfaceID for Zabbix config
                 updates["interfaceid"] = host["interfaces"][0]['interfaceid']
-                try:
-                    # API call to Zabbix
-                    self.zabbix.hostinterface.update(updates)
-                    e = f"Host {self.name}: solved interface conflict."
-                    self.logger.info(e)
-                    self.create_journal_entry("info", e)
-                except APIRequestError as e:
-                    msg = f"Zabbix returned the following error: {str(e)}."
-                    self.logger.error(msg)
-                    raise SyncExternalError(msg) from e
+                if host_update_buffer is not None:
+                    host_update_buffer.add_interface(
+                        self.name, updates, partial(self._update_zabbix_interface, updates),
+                        self._zabbix_interface_updated)
+                else:
+                    self._update_zabbix_interface(updates)
             else:
                 # If no updates are found, Zabbix interface is in-sync
-                e = f"Host {self.name}: interface in-sync."
-                self.logger.debug(e)
+                self.logger.debug("Host %s: interface in-sync.", self.name)
         else:
             e = (f"Host {self.name} has unsupported interface configuration."
                  f" Host has total of {len(host['interfaces'])} interfaces. "
@@ -727,7 +839,8 @@ class PhysicalDevice():
     def create_journal_entry(self, severity, message):
         """
         Send a new Journal entry to NetBox. Usefull for viewing actions
-        in NetBox without having to look in Zabbix or the script log output
+        in NetBox without having to look in Zabbix or the script log output.
+        Entries are buffered and created in bulk by the journal buffer.
         """
         if self.journal:
             # Check if the severity is valid
@@ -739,14 +852,9 @@ class PhysicalDevice():
                        "kind": severity,
                        "comments": message
                        }
-            try:
-                self.nb_journals.create(journal)
-                self.logger.debug(f"Host {self.name}: Created journal entry in NetBox")
-                return True
-            except JournalError(e) as e:
-                self.logger.warning("Unable to create journal entry for "
-                                    f"{self.name}: NB returned {e}")
-            return False
+            self.nb_journals.add(journal)
+            self.logger.debug("Host %s: Queued journal entry for NetBox", self.name)
+            return True
         return False
 
     def zbx_template_comparer(self, tmpls_from_zabbix):
@@ -757,23 +865,26 @@ class PhysicalDevice():
         INPUT: list of NB and ZBX templates
         OUTPUT: Boolean True/False
         """
-        succesfull_templates = []
-        # Go through each NetBox template
-        for nb_tmpl in self.zbx_templates:
-            # Go through each Zabbix template
-            for pos, zbx_tmpl in enumerate(tmpls_from_zabbix):
-                # Check if template IDs match
-                if nb_tmpl["templateid"] == zbx_tmpl["templateid"]:
-                    # Templates match. Remove this template from the Zabbix templates
-                    # and add this NB template to the list of successfull templates
-                    tmpls_from_zabbix.pop(pos)
-                    succesfull_templates.append(nb_tmpl)
-                    self.logger.debug(f"Host {self.name}: template "
-                                      f"{nb_tmpl['name']} is present in Zabbix.")
-                    break
-        if len(succesfull_templates) == len(self.zbx_templates) and len(tmpls_from_zabbix) == 0:
-            # All of the NetBox templates have been confirmed as successfull
-            # and the ZBX template list is empty. This means that
-            # all of the templates match.
+        nb_template_ids = {nb_tmpl["templateid"] for nb_tmpl in self.zbx_templates}
+        zbx_template_ids = {zbx_tmpl["templateid"] for zbx_tmpl in tmpls_from_zabbix}
+        # Only go through the individual templates when they are logged
+        if self.logger.isEnabledFor(DEBUG):
+            for nb_tmpl in self.zbx_templates:
+                if nb_tmpl["templateid"] in zbx_template_ids:
+                    self.logger.debug("Host %s: template %s is present in Zabbix.",
+                                      self.name, nb_tmpl['name'])
+                else:
+                    self.logger.debug("Host %s: template %s is missing in Zabbix.",
+                                      self.name, nb_tmpl['name'])
+            for template_id in zbx_template_ids - nb_template_ids:
+                self.logger.debug("Host %s: template ID %s is not configured in NetBox.",
+                                  self.name, template_id)
+        # All templates match when both sides have the same template IDs.
+        # Sets of a different size are rejected without comparing the IDs.
+        if nb_template_ids == zbx_template_ids:
             return True
+        # Only keep the Zabbix templates which are not in NetBox.
+        # These are the templates which are cleared on update.
+        tmpls_from_zabbix[:] = [zbx_tmpl for zbx_tmpl in tmpls_from_zabbix
+                                if zbx_tmpl["templateid"] not in nb_template_ids]
         return False
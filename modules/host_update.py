@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Zabbix host update handling
+"""
+from logging import getLogger
+from threading import Lock
+from zabbix_utils import APIRequestError, ProcessingError
+from modules.exceptions import SyncError
+
+
+class HostUpdateBuffer():
+    """
+    Collects Zabbix host and interface updates and sends them in batches.
+    INPUT: (ZabbixAPI class, amount of updates per request, logger)
+    """
+
+    def __init__(self, zabbix, batch_size=50, logger=None):
+        self.zabbix = zabbix
+        self.batch_size = batch_size
+        self.logger = logger if logger else getLogger(__name__)
+        self.updates = {"host": [], "hostinterface": []}
+        self.lock = Lock()
+
+    def add(self, name, params, send, updated):
+        """
+        Adds the updates of a host to the buffer.
+        All buffered updates are sent to Zabbix once the buffer is full.
+        INPUT: (host name, host.update parameters including the hostid,
+                function which updates only this host,
+                function which is called once the update has been sent)
+        """
+        self._add("host", name, params, send, updated)
+
+    def add_interface(self, name, params, send, updated):
+        """
+        Adds the interface updates of a host to the buffer.
+        INPUT: (host name, hostinterface.update parameters including the interfaceid,
+                function which updates only this interface,
+                function which is called once the update has been sent)
+        """
+        self._add("hostinterface", name, params, send, updated)
+
+    def _add(self, api_object, name, params, send, updated):
+        """ Buffers an update and sends the batch of this API object once full. """
+        with self.lock:
+            batch = self.updates[api_object]
+            batch.append((name, params, send, updated))
+            if len(batch) < self.batch_size:
+                return
+            self.updates[api_object] = []
+        self._update(api_object, batch)
+
+    def flush(self):
+        """ Sends all buffered host and interface updates to Zabbix. """
+        with self.lock:
+            updates = self.updates
+            self.updates = {"host": [], "hostinterface": []}
+        for api_object, batch in updates.items():
+            if batch:
+                self._update(api_object, batch)
+
+    def _update(self, api_object, batch):
+        """
+        Updates a list of hosts or interfaces with a single API call.
+        Zabbix rejects the whole batch when a single update is invalid,
+        in that case every update is sent on its own. The same is done when
+        the batch could not be processed, updates can safely be sent again.
+        """
+        try:
+            getattr(self.zabbix, api_object).update(*[params for _, params, _, _ in batch])
+        except (APIRequestError, ProcessingError) as e:
+            self.logger.warning("Unable to send %s %s updates at once, sending them "
+                                "one by one. Zabbix returned: %s", len(batch), api_object, e)
+            for name, _, send, _ in batch:
+                try:
+                    send()
+                except SyncError:
+                    # The error has been logged by the host
+                    pass
+                except ProcessingError as error:
+                    self.logger.error("Host %s: Unable to send %s update to Zabbix, "
+                                      "the update may not have been applied: %s",
+                                      name, api_object, error)
+            return
+        for _, _, _, updated in batch:
+            updated()
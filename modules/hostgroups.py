@@ -79,13 +79,15 @@ class Hostgroup():
                                "region": {"flag": nested_region_flag, "data": nb_regions}}
 
     def generate(self, hg_format=None):
-        """Generate hostgroup based on a provided format"""
+        """Generate hostgroup based on a provided format.
+        The format is either a string or an already split sequence of items."""
         # Set format to default in case its not specified
         if not hg_format:
-            hg_format = "site/manufacturer/role" if self.type == "dev" else "cluster/role"
+            hg_format = (("site", "manufacturer", "role") if self.type == "dev"
+                         else ("cluster", "role"))
         # Split all given names
         hg_output = []
-        hg_items = hg_format.split("/")
+        hg_items = hg_format.split("/") if isinstance(hg_format, str) else hg_format
         for hg_item in hg_items:
             # Check if requested data is available as option for this host
             if hg_item not in self.format_options:
@@ -136,14 +138,15 @@ class Hostgroup():
         INPUT: Custom field name
         OUTPUT: dictionary with 'result' and 'cf' keys.
         """
+        custom_fields = self.nb.custom_fields
         # Check if the custom field exists
-        if hg_category not in self.nb.custom_fields:
+        if hg_category not in custom_fields:
             return {"result": False, "cf": None}
         # Checks if the custom field has been populated
-        if not bool(self.nb.custom_fields[hg_category]):
+        if not bool(custom_fields[hg_category]):
             return {"result": True, "cf": None}
         # Custom field exists and is populated
-        return {"result": True, "cf": self.nb.custom_fields[hg_category]}
+        return {"result": True, "cf": custom_fields[hg_category]}
 
     def generate_parents(self, nest_type, child_object):
         """
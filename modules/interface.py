@@ -4,14 +4,20 @@ All of the Zabbix interface related configuration
 """
 from modules.exceptions import InterfaceConfigError
 
+# SNMPv3 options which are copied from the NetBox config context
+SNMPV3_ITEMS = frozenset(["securityname", "securitylevel", "authpassphrase",
+                          "privpassphrase", "authprotocol", "privprotocol",
+                          "contextname"])
+
+
 class ZabbixInterface():
     """Class that represents a Zabbix interface."""
+    __slots__ = ("context", "ip", "interface")
 
     def __init__(self, context, ip):
         self.context = context
         self.ip = ip
-        self.skelet = {"main": "1", "useip": "1", "dns": "", "ip": self.ip}
-        self.interface = self.skelet
+        self.interface = {"main": "1", "useip": "1", "dns": "", "ip": self.ip}
 
     def _set_default_port(self):
         """Sets default TCP / UDP port for different interface types"""
@@ -42,9 +48,28 @@ class ZabbixInterface():
             return False
         return False
 
+    def _set_snmp_community(self, snmp):
+        """ Sets the SNMPv1 / SNMPv2 community string """
+        if "community" in snmp:
+            # Set SNMP community to confix context value
+            community = snmp["community"]
+        else:
+            # Set SNMP community to default
+            community = "{$SNMP_COMMUNITY}"
+        self.interface["details"]["community"] = str(community)
+
+    def _set_snmpv3(self, snmp):
+        """ Sets all SNMPv3 NetBox related configs """
+        for key in SNMPV3_ITEMS & snmp.keys():
+            self.interface["details"][key] = str(snmp[key])
+
+    # Functions which set the details for each SNMP version
+    snmp_version_handlers = {"1": _set_snmp_community,
+                             "2": _set_snmp_community,
+                             "3": _set_snmpv3}
+
     def set_snmp(self):
         """ Check if interface is type SNMP """
-        # pylint: disable=too-many-branches
         if self.interface["type"] == 2:
             # Checks if SNMP settings are defined in NetBox
             if "snmp" in self.context["zabbix"]:
@@ -52,37 +77,22 @@ class ZabbixInterface():
                 self.interface["details"] = {}
                 # Checks if bulk config has been defined
                 if "bulk" in snmp:
-                    self.interface["details"]["bulk"] = str(snmp.pop("bulk"))
+                    self.interface["details"]["bulk"] = str(snmp["bulk"])
                 else:
                     # Fallback to bulk enabled if not specified
                     self.interface["details"]["bulk"] = "1"
                 # SNMP Version config is required in NetBox config context
                 if snmp.get("version"):
-                    self.interface["details"]["version"] = str(snmp.pop("version"))
+                    self.interface["details"]["version"] = str(snmp["version"])
                 else:
                     e = "SNMP version option is not defined."
                     raise InterfaceConfigError(e)
-                # If version 1 or 2 is used, get community string
-                if self.interface["details"]["version"] in ['1','2']:
-                    if "community" in snmp:
-                        # Set SNMP community to confix context value
-                        community = snmp["community"]
-                    else:
-                        # Set SNMP community to default
-                        community = "{$SNMP_COMMUNITY}"
-                    self.interface["details"]["community"] = str(community)
-                # If version 3 has been used, get all
-                # SNMPv3 NetBox related configs
-                elif self.interface["details"]["version"] == '3':
-                    items = ["securityname", "securitylevel", "authpassphrase",
-                             "privpassphrase", "authprotocol", "privprotocol",
-                             "contextname"]
-                    for key, item in snmp.items():
-                        if key in items:
-                            self.interface["details"][key] = str(item)
-                else:
+                # Set the details which belong to this SNMP version
+                handler = self.snmp_version_handlers.get(self.interface["details"]["version"])
+                if not handler:
                     e = "Unsupported SNMP version."
                     raise InterfaceConfigError(e)
+                handler(self, snmp)
             else:
                 e = "Interface type SNMP but no parameters provided."
                 raise InterfaceConfigError(e)
@@ -92,12 +102,11 @@ class ZabbixInterface():
 
     def set_default_snmp(self):
         """ Set default config to SNMPv2, port 161 and community macro. """
-        self.interface = self.skelet
-        self.interface["type"] = "2"
-        self.interface["port"] = "161"
-        self.interface["details"] = {"version": "2",
-                                     "community": "{$SNMP_COMMUNITY}",
-                                     "bulk": "1"}
+        self.interface = {"main": "1", "useip": "1", "dns": "", "ip": self.ip,
+                          "type": "2", "port": "161",
+                          "details": {"version": "2",
+                                      "community": "{$SNMP_COMMUNITY}",
+                                      "bulk": "1"}}
 
     def set_default_agent(self):
         """Sets interface to Zabbix agent defaults"""
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+NetBox journal entry handling
+"""
+from logging import getLogger
+from threading import Lock
+from pynetbox.core.query import RequestError
+
+
+class JournalBuffer():
+    """
+    Collects NetBox journal entries and creates them in bulk.
+    INPUT: (NB journal class, amount of entries per request, logger)
+    """
+
+    def __init__(self, nb_journal_class, flush_size=200, logger=None):
+        self.nb_journals = nb_journal_class
+        self.flush_size = flush_size
+        self.logger = logger if logger else getLogger(__name__)
+        self.entries = []
+        self.lock = Lock()
+
+    def add(self, journal):
+        """
+        Adds a journal entry to the buffer.
+        All buffered entries are sent to NetBox once the buffer is full.
+        """
+        with self.lock:
+            self.entries.append(journal)
+            if len(self.entries) < self.flush_size:
+                return
+            entries = self.entries
+            self.entries = []
+        self._create(entries)
+
+    def flush(self):
+        """ Sends all buffered journal entries to NetBox. """
+        with self.lock:
+            entries = self.entries
+            self.entries = []
+        if entries:
+            self._create(entries)
+
+    def _create(self, entries):
+        """ Creates a list of journal entries with a single API call. """
+        try:
+            self.nb_journals.create(entries)
+            self.logger.debug("Created %s journal entries in NetBox.", len(entries))
+        except RequestError as e:
+            for journal in entries:
+                self.logger.warning("Unable to create journal entry for %s %s: "
+                                    "NB returned %s", journal['assigned_object_type'],
+                                    journal['assigned_object_id'], e)
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+NetBox object update handling
+"""
+from logging import getLogger
+from threading import Lock
+from pynetbox.core.query import RequestError
+
+
+class NetBoxUpdateBuffer():
+    """
+    Collects changes to NetBox objects of a single endpoint
+    and sends them with a bulk update.
+    INPUT: (NB endpoint class, amount of objects per request, logger)
+    """
+
+    def __init__(self, nb_endpoint, batch_size=50, logger=None):
+        self.nb_endpoint = nb_endpoint
+        self.batch_size = batch_size
+        self.logger = logger if logger else getLogger(__name__)
+        self.updates = []
+        self.lock = Lock()
+
+    def add(self, nb_object, updates):
+        """
+        Adds the changes of a NetBox object to the buffer.
+        All buffered changes are sent to NetBox once the buffer is full.
+        INPUT: (NB object, dict of changed fields)
+        """
+        with self.lock:
+            self.updates.append((nb_object, updates))
+            if len(self.updates) < self.batch_size:
+                return
+            batch = self.updates
+            self.updates = []
+        self._update(batch)
+
+    def flush(self):
+        """ Sends all buffered changes to NetBox. """
+        with self.lock:
+            batch = self.updates
+            self.updates = []
+        if batch:
+            self._update(batch)
+
+    def _update(self, batch):
+        """
+        Updates a list of NetBox objects with a single API call.
+        NetBox rejects the whole request when a single object is invalid,
+        in that case every object is updated on its own.
+        """
+        try:
+            self.nb_endpoint.update([{"id": nb_object.id, **updates}
+                                     for nb_object, updates in batch])
+            self.logger.debug("Updated %s objects in NetBox.", len(batch))
+            return
+        except RequestError as e:
+            self.logger.warning("Unable to update %s NetBox objects at once, updating "
+                                "them one by one. NetBox returned: %s", len(batch), e)
+        for nb_object, updates in batch:
+            try:
+                nb_object.update(updates)
+            except RequestError as e:
+                self.logger.error("Unable to update NetBox object %s with data %s: "
+                                  "NB returned %s", nb_object.id, updates, e)
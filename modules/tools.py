@@ -1,24 +1,20 @@
 """A collection of tools used by several classes"""
 def convert_recordset(recordset):
-    """ Converts netbox RedcordSet to list of dicts. """
-    recordlist = []
-    for record in recordset:
-        recordlist.append(record.__dict__)
-    return recordlist
+    """ Converts netbox RedcordSet to dict of dicts, keyed by name. """
+    return {record.name: record.__dict__ for record in recordset}
 
-def build_path(endpoint, list_of_dicts):
+def build_path(endpoint, dict_of_dicts):
     """
     Builds a path list of related parent/child items.
     This can be used to generate a joinable list to
     be used in hostgroups.
+    INPUT: name of the child item and dict of items keyed by name
     """
     item_path = []
-    itemlist = [i for i in list_of_dicts if i['name'] == endpoint]
-    item = itemlist[0] if len(itemlist) == 1 else None
+    item = dict_of_dicts[endpoint]
     item_path.append(item['name'])
     while item['_depth'] > 0:
-        itemlist = [i for i in list_of_dicts if i['name'] == str(item['parent'])]
-        item = itemlist[0] if len(itemlist) == 1 else None
+        item = dict_of_dicts[str(item['parent'])]
         item_path.append(item['name'])
     item_path.reverse()
     return item_path
@@ -27,18 +23,31 @@ def proxy_prepper(proxy_list, proxy_group_list):
     """
     Function that takes 2 lists and converts them using a
     standardized format for further processing.
+    OUTPUT: dict per proxy type, each keyed by proxy name.
+    Proxies and proxy groups are kept apart since their names may overlap.
     """
-    output = []
+    output = {"proxy": {}, "proxy_group": {}}
     for proxy in proxy_list:
         proxy["type"] = "proxy"
         proxy["id"] = proxy["proxyid"]
         proxy["idtype"] = "proxyid"
         proxy["monitored_by"] = 1
-        output.append(proxy)
+        output["proxy"][proxy["name"]] = proxy
     for group in proxy_group_list:
         group["type"] = "proxy_group"
         group["id"] = group["proxy_groupid"]
         group["idtype"] = "proxy_groupid"
         group["monitored_by"] = 2
-        output.append(group)
+        output["proxy_group"][group["name"]] = group
     return output
+
+def hydrate_record(record, field, full_records):
+    """
+    Replaces a nested NetBox object with the full object of the same ID.
+    pynetbox otherwise requests the full object for every host
+    as soon as a field is used which is not part of the nested object.
+    INPUT: NetBox record, name of the nested field and dict of full records keyed by ID
+    """
+    nested = getattr(record, field, None)
+    if nested and nested.id in full_records:
+        setattr(record, field, full_records[nested.id])
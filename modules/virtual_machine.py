@@ -19,6 +19,9 @@ except ModuleNotFoundError:
 
 class VirtualMachine(PhysicalDevice):
     """Model for virtual machines"""
+    # All attributes are defined in the slots of PhysicalDevice
+    __slots__ = ()
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.hostgroup = None
@@ -50,9 +53,11 @@ class VirtualMachine(PhysicalDevice):
         Overwrites device function to select an agent interface type by default
         Agent type interfaces are more likely to be used with VMs then SNMP
         """
+        if self.zbx_interfaces is not None:
+            return self.zbx_interfaces
         try:
             # Initiate interface class
-            interface = ZabbixInterface(self.nb.config_context, self.ip)
+            interface = ZabbixInterface(self.config_context, self.ip)
             # Check if NetBox has device context.
             # If not fall back to old config.
             if interface.get_context():
@@ -61,7 +66,8 @@ class VirtualMachine(PhysicalDevice):
                     interface.set_snmp()
             else:
                 interface.set_default_agent()
-            return [interface.interface]
+            self.zbx_interfaces = [interface.interface]
+            return self.zbx_interfaces
         except InterfaceConfigError as e:
             message = f"{self.name}: {e}"
             self.logger.warning(message)
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Zabbix API connection handling
+"""
+from logging import getLogger
+from random import uniform
+from time import sleep
+from zabbix_utils import ZabbixAPI, ProcessingError
+
+# API methods which do not change anything in Zabbix and are safe to send again
+RETRY_METHODS = frozenset(["apiinfo.version", "user.login"])
+
+
+def is_read_only(method):
+    """ Checks if an API method only reads data from Zabbix. """
+    return method.endswith(".get") or method in RETRY_METHODS
+
+
+class RetryZabbixAPI(ZabbixAPI):
+    """
+    ZabbixAPI which retries read-only requests that could not be processed,
+    for instance when Zabbix is unreachable or overloaded.
+    Writes are never sent again, since Zabbix may already have applied them.
+    Errors returned by the Zabbix API itself are raised right away,
+    since sending the same request again gives the same result.
+    INPUT: (ZabbixAPI arguments, amount of retries, logger)
+    """
+
+    def __init__(self, *args, retries=3, logger=None, **kwargs):
+        # Set before the parent logs in, which already sends requests
+        self.retries = retries
+        self.retry_logger = logger if logger else getLogger(__name__)
+        super().__init__(*args, **kwargs)
+
+    def send_api_request(self, method, *args, **kwargs):
+        """ Sends an API request and retries read-only requests with backoff. """
+        attempt = 0
+        while True:
+            try:
+                return super().send_api_request(method, *args, **kwargs)
+            except ProcessingError as e:
+                if attempt >= self.retries or not is_read_only(method):
+                    raise
+                # Exponential backoff with jitter,
+                # so the workers don't all retry at the same time.
+                delay = uniform(0, min(10, 0.5 * 2 ** attempt))
+                attempt += 1
+                self.retry_logger.warning("Zabbix request %s failed, retry %s/%s in %.1f "
+                                          "seconds: %s", method, attempt, self.retries,
+                                          delay, e)
+                sleep(delay)
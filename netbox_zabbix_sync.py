@@ -4,15 +4,26 @@
 """NetBox to Zabbix sync script."""
 import logging
 import argparse
+import atexit
 import ssl
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from itertools import chain
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from os import environ, path, sys
+from queue import SimpleQueue
 from pynetbox import api
 from pynetbox.core.query import RequestError as NBRequestError
+from requests.adapters import HTTPAdapter
 from requests.exceptions import ConnectionError as RequestsConnectionError
-from zabbix_utils import ZabbixAPI, APIRequestError, ProcessingError
-from modules.device import PhysicalDevice
+from urllib3.util.retry import Retry
+from zabbix_utils import APIRequestError, ProcessingError
+from modules.device import PhysicalDevice, ZABBIX_HOST_SELECT
 from modules.virtual_machine import VirtualMachine
-from modules.tools import convert_recordset, proxy_prepper
+from modules.journal import JournalBuffer
+from modules.host_update import HostUpdateBuffer
+from modules.netbox_update import NetBoxUpdateBuffer
+from modules.zabbix_api import RetryZabbixAPI
+from modules.tools import convert_recordset, hydrate_record, proxy_prepper
 from modules.exceptions import EnvironmentVarError, HostgroupError, SyncError
 try:
     from config import (
@@ -24,6 +35,8 @@ try:
         zabbix_device_disable,
         hostgroup_format,
         vm_hostgroup_format,
+        traverse_regions,
+        traverse_site_groups,
         nb_device_filter,
         sync_vms,
         nb_vm_filter
@@ -40,14 +53,23 @@ lgout = logging.StreamHandler()
 lgout.setFormatter(log_format)
 lgout.setLevel(logging.DEBUG)
 
-lgfile = logging.FileHandler(path.join(path.dirname(
-                             path.realpath(__file__)), "sync.log"))
+# Rotate the log file to limit its size. The file is
+# only opened once the first message is written.
+lgfile = RotatingFileHandler(path.join(path.dirname(
+                             path.realpath(__file__)), "sync.log"),
+                             maxBytes=10_000_000, backupCount=5, delay=True)
 lgfile.setFormatter(log_format)
 lgfile.setLevel(logging.DEBUG)
+# Log messages are written to the console and log file by a separate
+# thread, so that the sync workers don't wait on log output.
+# The remaining messages are written when the script exits.
+log_queue = SimpleQueue()
+lglistener = QueueListener(log_queue, lgout, lgfile, respect_handler_level=True)
+lglistener.start()
+atexit.register(lglistener.stop)
 
 logger = logging.getLogger("NetBox-Zabbix-sync")
-logger.addHandler(lgout)
-logger.addHandler(lgfile)
+logger.addHandler(QueueHandler(log_queue))
 logger.setLevel(logging.WARNING)
 
 
@@ -57,39 +79,59 @@ def main(arguments):
     # set environment variables
     if arguments.verbose:
         logger.setLevel(logging.DEBUG)
+    # Read the environment once
+    env = dict(environ)
     env_vars = ["ZABBIX_HOST", "NETBOX_HOST", "NETBOX_TOKEN"]
-    if "ZABBIX_TOKEN" in environ:
+    if "ZABBIX_TOKEN" in env:
         env_vars.append("ZABBIX_TOKEN")
     else:
         env_vars.append("ZABBIX_USER")
         env_vars.append("ZABBIX_PASS")
-    for var in env_vars:
-        if var not in environ:
-            e = f"Environment variable {var} has not been defined."
-            logger.error(e)
-            raise EnvironmentVarError(e)
+    # Report all missing variables at once
+    missing_vars = [var for var in env_vars if var not in env]
+    if missing_vars:
+        e = f"Environment variable(s) {', '.join(missing_vars)} have not been defined."
+        logger.error(e)
+        raise EnvironmentVarError(e)
     # Get all virtual environment variables
     if "ZABBIX_TOKEN" in env_vars:
         zabbix_user = None
         zabbix_pass = None
-        zabbix_token = environ.get("ZABBIX_TOKEN")
+        zabbix_token = env["ZABBIX_TOKEN"]
     else:
-        zabbix_user = environ.get("ZABBIX_USER")
-        zabbix_pass = environ.get("ZABBIX_PASS")
+        zabbix_user = env["ZABBIX_USER"]
+        zabbix_pass = env["ZABBIX_PASS"]
         zabbix_token = None
-    zabbix_host = environ.get("ZABBIX_HOST")
-    netbox_host = environ.get("NETBOX_HOST")
-    netbox_token = environ.get("NETBOX_TOKEN")
+    zabbix_host = env["ZABBIX_HOST"]
+    netbox_host = env["NETBOX_HOST"]
+    netbox_token = env["NETBOX_TOKEN"]
     # Set NetBox API
     netbox = api(netbox_host, token=netbox_token, threading=True)
-    # Check if the provided Hostgroup layout is valid
-    hg_objects = hostgroup_format.split("/")
-    allowed_objects = ["location", "role", "manufacturer", "region",
-                       "site", "site_group", "tenant", "tenant_group"]
-    # Create API call to get all custom fields which are on the device objects
+    # Keep a connection open for every worker so that
+    # NetBox connections are reused instead of reopened. The main thread
+    # streams the NetBox pages, and the pool is never smaller than the
+    # requests default of 10.
+    # Requests are retried when NetBox is temporarily unavailable or rate
+    # limited. The last response is returned once the retries run out,
+    # so pynetbox raises its usual RequestError.
+    netbox_retries = Retry(total=3, backoff_factor=0.3,
+                           status_forcelist=(429, 502, 503, 504),
+                           raise_on_status=False)
+    netbox_adapter = HTTPAdapter(pool_maxsize=max(arguments.workers + 1, 10),
+                                 max_retries=netbox_retries)
+    netbox.http_session.mount("http://", netbox_adapter)
+    netbox.http_session.mount("https://", netbox_adapter)
+    # Split the hostgroup layouts once, they are the same for every host
+    hg_objects = tuple(hostgroup_format.split("/"))
+    vm_hg_objects = tuple(vm_hostgroup_format.split("/")) if vm_hostgroup_format else None
+    # Host states are checked for every host
+    removal_states = frozenset(zabbix_device_removal)
+    disable_states = frozenset(zabbix_device_disable)
+    # Create API call to get all custom fields which are on the device objects.
+    # These are fetched once per sync run and indexed by name.
     try:
-        device_cfs = list(netbox.extras.custom_fields.filter(
-            type="text", content_type_id=23))
+        device_cfs = {cf.name: cf for cf in netbox.extras.custom_fields.filter(
+            type="text", content_type_id=23)}
     except RequestsConnectionError:
         logger.error(f"Unable to connect to NetBox with URL {netbox_host}."
                      " Please check the URL and status of NetBox.")
@@ -97,190 +139,296 @@ def main(arguments):
     except NBRequestError as e:
         logger.error(f"NetBox error: {e}")
         sys.exit(1)
-    for cf in device_cfs:
-        allowed_objects.append(cf.name)
-    for hg_object in hg_objects:
-        if hg_object not in allowed_objects:
-            e = (f"Hostgroup item {hg_object} is not valid. Make sure you"
-                 " use valid items and seperate them with '/'.")
-            logger.error(e)
-            raise HostgroupError(e)
+    # Check if the provided Hostgroup layout is valid
+    allowed_objects = frozenset(["location", "role", "manufacturer", "region",
+                                 "site", "site_group", "tenant", "tenant_group",
+                                 *device_cfs])
+    invalid_objects = [hg_object for hg_object in hg_objects
+                       if hg_object not in allowed_objects]
+    if invalid_objects:
+        e = (f"Hostgroup item {', '.join(invalid_objects)} is not valid. Make sure you"
+             " use valid items and seperate them with '/'.")
+        logger.error(e)
+        raise HostgroupError(e)
     # Set Zabbix API
     try:
         ssl_ctx = ssl.create_default_context()
 
         # If a custom CA bundle is set for pynetbox (requests), also use it for the Zabbix API
-        if environ.get("REQUESTS_CA_BUNDLE", None):
-            ssl_ctx.load_verify_locations(environ["REQUESTS_CA_BUNDLE"])
+        if env.get("REQUESTS_CA_BUNDLE"):
+            ssl_ctx.load_verify_locations(env["REQUESTS_CA_BUNDLE"])
 
+        # Requests which could not be processed by Zabbix are retried
         if not zabbix_token:
-            zabbix = ZabbixAPI(zabbix_host, user=zabbix_user,
-                               password=zabbix_pass, ssl_context=ssl_ctx)
+            zabbix = RetryZabbixAPI(zabbix_host, user=zabbix_user,
+                                    password=zabbix_pass, ssl_context=ssl_ctx,
+                                    logger=logger)
         else:
-            zabbix = ZabbixAPI(
-                zabbix_host, token=zabbix_token, ssl_context=ssl_ctx)
+            zabbix = RetryZabbixAPI(
+                zabbix_host, token=zabbix_token, ssl_context=ssl_ctx, logger=logger)
         zabbix.check_auth()
     except (APIRequestError, ProcessingError) as e:
         e = f"Zabbix returned the following error: {str(e)}"
         logger.error(e)
         sys.exit(1)
-    # Set API parameter mapping based on API version
-    if not str(zabbix.version).startswith('7'):
+    # Set API parameter mapping based on API version.
+    # Only the major version is used, so determine it once.
+    zabbix_version = int(str(zabbix.version).split('.', maxsplit=1)[0])
+    if zabbix_version < 7:
         proxy_name = "host"
     else:
         proxy_name = "name"
     # Get all Zabbix and NetBox data
-    netbox_devices = list(netbox.dcim.devices.filter(**nb_device_filter))
+    # Devices and VMs are streamed from NetBox while they are processed.
+    netbox_devices = netbox.dcim.devices.filter(**nb_device_filter)
     netbox_vms = []
     if sync_vms:
-        netbox_vms = list(
-            netbox.virtualization.virtual_machines.filter(**nb_vm_filter))
-    netbox_site_groups = convert_recordset((netbox.dcim.site_groups.all()))
-    netbox_regions = convert_recordset(netbox.dcim.regions.all())
-    netbox_journals = netbox.extras.journal_entries
-    zabbix_groups = zabbix.hostgroup.get(output=['groupid', 'name'])
-    zabbix_templates = zabbix.template.get(output=['templateid', 'name'])
+        netbox_vms = netbox.virtualization.virtual_machines.filter(**nb_vm_filter)
+    # Site groups and regions are only needed to look up parent objects
+    netbox_site_groups = {}
+    if traverse_site_groups:
+        netbox_site_groups = convert_recordset(netbox.dcim.site_groups.all())
+    netbox_regions = {}
+    if traverse_regions:
+        netbox_regions = convert_recordset(netbox.dcim.regions.all())
+    # Sites, tenants, device types and clusters are fetched once and replace
+    # the nested objects of each host. This prevents a request per host for
+    # fields such as the site region, tenant group, template custom field
+    # or cluster type.
+    netbox_sites = {site.id: site for site in netbox.dcim.sites.all()}
+    netbox_tenants = {tenant.id: tenant for tenant in netbox.tenancy.tenants.all()}
+    # Device types are only needed when templates are read from their custom field
+    netbox_device_types = {}
+    if not templates_config_context:
+        netbox_device_types = {device_type.id: device_type for device_type in
+                               netbox.dcim.device_types.all()}
+    netbox_clusters = {}
+    if sync_vms:
+        netbox_clusters = {cluster.id: cluster for cluster in
+                           netbox.virtualization.clusters.all()}
+    # Journal entries are created in bulk instead of one request per entry
+    netbox_journals = JournalBuffer(netbox.extras.journal_entries, logger=logger)
+    # Custom field changes are sent to NetBox with bulk updates
+    netbox_device_updates = NetBoxUpdateBuffer(netbox.dcim.devices,
+                                               arguments.batch_size, logger=logger)
+    netbox_vm_updates = NetBoxUpdateBuffer(netbox.virtualization.virtual_machines,
+                                           arguments.batch_size, logger=logger)
+    # Hostgroups and templates are looked up by name for every host
+    zabbix_groups = {group['name']: group for group in
+                     zabbix.hostgroup.get(output=['groupid', 'name'])}
+    zabbix_templates = {template['name']: template for template in
+                        zabbix.template.get(output=['templateid', 'name'])}
+    # Template IDs are shared by most hosts, intern them so that
+    # comparing NetBox and Zabbix templates is mostly an identity check
+    for template in zabbix_templates.values():
+        template['templateid'] = sys.intern(template['templateid'])
     zabbix_proxies = zabbix.proxy.get(output=['proxyid', proxy_name])
     # Set empty list for proxy processing Zabbix <= 6
     zabbix_proxygroups = []
-    if str(zabbix.version).startswith('7'):
+    if zabbix_version >= 7:
         zabbix_proxygroups = zabbix.proxygroup.get(
             output=["proxy_groupid", "name"])
     # Sanitize proxy data
     if proxy_name == "host":
-        for proxy in zabbix_proxies:
-            proxy['name'] = proxy.pop('host')
+        zabbix_proxies = [{'proxyid': proxy['proxyid'], 'name': proxy['host']}
+                          for proxy in zabbix_proxies]
     # Prepare list of all proxy and proxy_groups
     zabbix_proxy_list = proxy_prepper(zabbix_proxies, zabbix_proxygroups)
+    # Host updates are sent to Zabbix in batches
+    zabbix_host_updates = HostUpdateBuffer(zabbix, arguments.batch_size, logger=logger)
+    # Get all Zabbix hosts at once instead of one request per host
+    zabbix_hosts = {host['hostid']: host for host in
+                    zabbix.host.get(**ZABBIX_HOST_SELECT)}
+    for host in zabbix_hosts.values():
+        for template in host['parentTemplates']:
+            template['templateid'] = sys.intern(template['templateid'])
+    # Host names and visible names are used to check for existing hosts
+    zabbix_hostnames = {"host": {host['host'] for host in zabbix_hosts.values()},
+                        "name": {host['name'] for host in zabbix_hosts.values()}}
 
     # Get NetBox API version
     nb_version = netbox.version
 
-    # Go through all NetBox devices
-    for nb_vm in netbox_vms:
+    def skip_inactive_host(host, host_type):
+        """
+        Checks if a host in a removal state can be skipped.
+        Only hosts which are still in Zabbix have to be processed.
+        """
+        if host.status in removal_states and not host.zabbix_id:
+            # Host has been added to NetBox
+            # but is not in Activate state
+            logger.info("%s %s: skipping since this host is "
+                        "not in the active state.", host_type, host.name)
+            return True
+        return False
+
+    def sync_host(host, host_type):
+        """
+        Sync a NetBox device or VM with a template and hostgroup to Zabbix.
+        Removes, disables, checks or creates the host in Zabbix.
+        """
+        # Checks if host is in cleanup state.
+        # Hosts which are not in Zabbix have been skipped already.
+        if host.status in removal_states:
+            # Delete host from Zabbix
+            # and remove hostID from NetBox.
+            host.cleanup(zabbix_hosts)
+            logger.info("%s %s: cleanup complete", host_type, host.name)
+            return
+        # Check if the host is in the disabled state
+        if host.status in disable_states:
+            host.zabbix_state = 1
+        # Check if host is already in Zabbix
+        if host.zabbix_id:
+            host.ConsistencyCheck(zabbix_groups, zabbix_templates,
+                                  zabbix_proxy_list, full_proxy_sync,
+                                  create_hostgroups, zabbix_hosts,
+                                  zabbix_host_updates)
+            return
+        # Add hostgroup is config is set
+        if create_hostgroups:
+            # Create new hostgroup. Potentially multiple groups if nested.
+            # New groups are added to the Zabbix groups.
+            host.createZabbixHostgroup(zabbix_groups)
+        # Add host to Zabbix
+        host.createInZabbix(zabbix_groups, zabbix_templates,
+                            zabbix_proxy_list, zabbix_hostnames=zabbix_hostnames)
+
+    def sync_vm(nb_vm):
+        """Sync a single NetBox VM to Zabbix."""
         try:
+            hydrate_record(nb_vm, "site", netbox_sites)
+            hydrate_record(nb_vm, "tenant", netbox_tenants)
+            hydrate_record(nb_vm, "cluster", netbox_clusters)
+            # NetBox changes of the VM are sent with bulk updates
             vm = VirtualMachine(nb_vm, zabbix, netbox_journals, nb_version,
-                                create_journal, logger)
-            logger.debug(f"Host {vm.name}: started operations on VM.")
+                                zabbix_version, create_journal, logger,
+                                nb_update_buffer=netbox_vm_updates)
+            logger.debug("Host %s: started operations on VM.", vm.name)
+            # Skip the template and hostgroup lookups of inactive hosts
+            if skip_inactive_host(vm, "VM"):
+                return
             vm.set_vm_template()
             # Check if a valid template has been found for this VM.
             if not vm.zbx_template_names:
-                continue
-            vm.set_hostgroup(vm_hostgroup_format,
+                return
+            vm.set_hostgroup(vm_hg_objects,
                              netbox_site_groups, netbox_regions)
             # Check if a valid hostgroup has been found for this VM.
             if not vm.hostgroup:
-                continue
-            # Checks if device is in cleanup state
-            if vm.status in zabbix_device_removal:
-                if vm.zabbix_id:
-                    # Delete device from Zabbix
-                    # and remove hostID from NetBox.
-                    vm.cleanup()
-                    logger.info(f"VM {vm.name}: cleanup complete")
-                    continue
-                # Device has been added to NetBox
-                # but is not in Activate state
-                logger.info(f"VM {vm.name}: skipping since this VM is "
-                            f"not in the active state.")
-                continue
-            # Check if the VM is in the disabled state
-            if vm.status in zabbix_device_disable:
-                vm.zabbix_state = 1
-            # Check if VM is already in Zabbix
-            if vm.zabbix_id:
-                vm.ConsistencyCheck(zabbix_groups, zabbix_templates,
-                                    zabbix_proxy_list, full_proxy_sync,
-                                    create_hostgroups)
-                continue
-            # Add hostgroup is config is set
-            if create_hostgroups:
-                # Create new hostgroup. Potentially multiple groups if nested
-                hostgroups = vm.createZabbixHostgroup(zabbix_groups)
-                # go through all newly created hostgroups
-                for group in hostgroups:
-                    # Add new hostgroups to zabbix group list
-                    zabbix_groups.append(group)
-            # Add VM to Zabbix
-            vm.createInZabbix(zabbix_groups, zabbix_templates,
-                              zabbix_proxy_list)
+                return
+            sync_host(vm, "VM")
         except SyncError:
             pass
 
-    for nb_device in netbox_devices:
+    def sync_device(nb_device):
+        """Sync a single NetBox device to Zabbix."""
         try:
+            hydrate_record(nb_device, "site", netbox_sites)
+            hydrate_record(nb_device, "tenant", netbox_tenants)
+            hydrate_record(nb_device, "device_type", netbox_device_types)
             # Set device instance set data such as hostgroup and template information.
+            # NetBox changes of the device are sent with bulk updates
             device = PhysicalDevice(nb_device, zabbix, netbox_journals, nb_version,
-                                    create_journal, logger)
-            logger.debug(f"Host {device.name}: started operations on device.")
+                                    zabbix_version, create_journal, logger,
+                                    nb_update_buffer=netbox_device_updates)
+            logger.debug("Host %s: started operations on device.", device.name)
+            # Skip the template and hostgroup lookups of inactive hosts
+            if skip_inactive_host(device, "Device"):
+                return
             device.set_template(templates_config_context,
                                 templates_config_context_overrule)
             # Check if a valid template has been found for this VM.
             if not device.zbx_template_names:
-                continue
+                return
             device.set_hostgroup(
-                hostgroup_format, netbox_site_groups, netbox_regions)
+                hg_objects, netbox_site_groups, netbox_regions)
             # Check if a valid hostgroup has been found for this VM.
             if not device.hostgroup:
-                continue
+                return
             device.set_inventory(nb_device)
             # Checks if device is part of cluster.
             # Requires clustering variable
             if device.isCluster() and clustering:
                 # Check if device is primary or secondary
                 if device.promoteMasterDevice():
-                    e = (f"Device {device.name}: is "
-                         f"part of cluster and primary.")
-                    logger.info(e)
+                    logger.info("Device %s: is part of cluster and primary.",
+                                device.name)
                 else:
                     # Device is secondary in cluster.
                     # Don't continue with this device.
-                    e = (f"Device {device.name}: is part of cluster "
-                         f"but not primary. Skipping this host...")
-                    logger.info(e)
-                    continue
-            # Checks if device is in cleanup state
-            if device.status in zabbix_device_removal:
-                if device.zabbix_id:
-                    # Delete device from Zabbix
-                    # and remove hostID from NetBox.
-                    device.cleanup()
-                    logger.info(f"Device {device.name}: cleanup complete")
-                    continue
-                # Device has been added to NetBox
-                # but is not in Activate state
-                logger.info(f"Device {device.name}: skipping since this device is "
-                            f"not in the active state.")
-                continue
-            # Check if the device is in the disabled state
-            if device.status in zabbix_device_disable:
-                device.zabbix_state = 1
-            # Check if device is already in Zabbix
-            if device.zabbix_id:
-                device.ConsistencyCheck(zabbix_groups, zabbix_templates,
-                                        zabbix_proxy_list, full_proxy_sync,
-                                        create_hostgroups)
-                continue
-            # Add hostgroup is config is set
-            if create_hostgroups:
-                # Create new hostgroup. Potentially multiple groups if nested
-                hostgroups = device.createZabbixHostgroup(zabbix_groups)
-                # go through all newly created hostgroups
-                for group in hostgroups:
-                    # Add new hostgroups to zabbix group list
-                    zabbix_groups.append(group)
-            # Add device to Zabbix
-            device.createInZabbix(zabbix_groups, zabbix_templates,
-                                  zabbix_proxy_list)
+                    logger.info("Device %s: is part of cluster but not primary. "
+                                "Skipping this host...", device.name)
+                    return
+            sync_host(device, "Device")
         except SyncError:
             pass
 
+    def check_sync_result(future):
+        """Logs unexpected errors of a single host sync."""
+        # Unexpected errors of a single host should not stop the other hosts
+        if future.exception():
+            logger.error("Unexpected error during host sync: %s",
+                         future.exception(), exc_info=future.exception())
 
-if __name__ == "__main__":
+    # Go through all NetBox VMs and devices. Every host is mostly waiting
+    # on Zabbix and NetBox API calls, so hosts are processed in parallel.
+    hosts = chain(((sync_vm, nb_vm) for nb_vm in netbox_vms),
+                  ((sync_device, nb_device) for nb_device in netbox_devices))
+    try:
+        with ThreadPoolExecutor(max_workers=arguments.workers) as executor:
+            futures = set()
+            for sync, nb_host in hosts:
+                # Limit the amount of queued hosts, so that NetBox results are
+                # read while hosts are synced instead of all held in memory.
+                if len(futures) >= arguments.workers * 2:
+                    done, futures = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        check_sync_result(future)
+                futures.add(executor.submit(sync, nb_host))
+            for future in as_completed(futures):
+                check_sync_result(future)
+    finally:
+        # Send all remaining host updates to Zabbix and NetBox and create all remaining
+        # journal entries in NetBox, also when the sync has been interrupted.
+        try:
+            zabbix_host_updates.flush()
+        finally:
+            try:
+                netbox_device_updates.flush()
+                netbox_vm_updates.flush()
+            finally:
+                netbox_journals.flush()
+
+
+def positive_int(value):
+    """ Argument type which only accepts integers of 1 and higher. """
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"{value} is not a positive integer")
+    return number
+
+
+def build_parser():
+    """Builds the command line argument parser of the script."""
     parser = argparse.ArgumentParser(
         description='A script to sync Zabbix with NetBox device data.'
     )
     parser.add_argument("-v", "--verbose", help="Turn on debugging.",
                         action="store_true")
-    args = parser.parse_args()
+    # Options which tune how hosts are synced
+    sync_group = parser.add_argument_group("sync performance")
+    sync_group.add_argument("-w", "--workers", type=positive_int, default=8,
+                            help="Amount of hosts which are synced at the same time.")
+    sync_group.add_argument("-b", "--batch-size", type=positive_int, default=50,
+                            help="Amount of hosts which are updated in Zabbix and "
+                                 "NetBox per request.")
+    return parser
+
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
     main(args)